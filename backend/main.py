@@ -3,14 +3,93 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import chess
 import sqlite3
+import asyncio
+import time
 from pathlib import Path
-from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 import hashlib
 import os
 import base64
 import hmac
 
-app = FastAPI()
+import aiosqlite
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from move_handler import apply_move
+
+DB_PATH = Path(__file__).with_name("chess.db")
+
+
+class SQLiteConnectionPool:
+    """Small pool of long-lived aiosqlite connections.
+
+    Keeps SQLite's page cache warm across requests and makes sure DB work
+    never runs synchronously on the event loop that also serves the
+    websockets.
+    """
+
+    def __init__(self, db_path: Path, size: int = 4) -> None:
+        self._db_path = db_path
+        self._size = size
+        self._queue: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    async def open(self) -> None:
+        for _ in range(self._size):
+            conn = await aiosqlite.connect(self._db_path)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA temp_store=MEMORY")
+            await conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+            await conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+            self._queue.put_nowait(conn)
+
+    async def close(self) -> None:
+        while not self._queue.empty():
+            await self._queue.get_nowait().close()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self._queue.get()
+        try:
+            yield conn
+        finally:
+            # Never re-queue a connection holding an open (possibly failed)
+            # transaction: it would keep the database write-locked and wedge
+            # every later writer.
+            if conn.in_transaction:
+                await conn.rollback()
+            self._queue.put_nowait(conn)
+
+
+pool = SQLiteConnectionPool(DB_PATH)
+
+# Argon2 verification runs here instead of on the event loop: each verify
+# holds the GIL for tens of milliseconds, so concurrent logins would
+# otherwise serialize on one core and stall every websocket in the process.
+kdf_executor: ProcessPoolExecutor | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global kdf_executor
+    init_db()
+    await pool.open()
+    kdf_executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+    sweeper = asyncio.create_task(_sweep_idle_rooms())
+    yield
+    sweeper.cancel()
+    kdf_executor.shutdown(wait=False)
+    kdf_executor = None
+    await pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,8 +100,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DB_PATH = Path(__file__).with_name("chess.db")
-
 
 def get_connection() -> sqlite3.Connection:
     conn = sqlite3.connect(DB_PATH)
@@ -39,7 +116,7 @@ def init_db() -> None:
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
+                    password_hash BLOB NOT NULL,
                     rating INTEGER NOT NULL DEFAULT 1200,
                     wins INTEGER NOT NULL DEFAULT 0,
                     losses INTEGER NOT NULL DEFAULT 0,
@@ -65,23 +142,53 @@ def init_db() -> None:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS game_moves (
+                    game_id INTEGER NOT NULL,
+                    ply INTEGER NOT NULL,
+                    uci TEXT NOT NULL,
+                    PRIMARY KEY (game_id, ply),
+                    FOREIGN KEY (game_id) REFERENCES games(id)
+                )
+                """
+            )
     finally:
         conn.close()
 
 
-def hash_password(password: str) -> str:
-    salt = os.urandom(16)
-    digest = hashlib.sha256(salt + password.encode("utf-8")).digest()
-    return (
-        base64.b64encode(salt).decode("ascii")
-        + "$"
-        + base64.b64encode(digest).decode("ascii")
-    )
+# Argon2id with moderate cost: ~50ms per hash, 64 MiB memory.
+ph = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
+# Pepper for the verifier-cache key so the plaintext password never becomes
+# a cache key itself. Set CHESS_PEPPER in production.
+_PEPPER = os.environ.get("CHESS_PEPPER", "chess-trail-dev-pepper").encode("utf-8")
+
+# Bounded LRU cache of verification results keyed by
+# hmac(pepper, password || stored_hash), so repeated logins with the same
+# credentials skip the KDF entirely.
+_VERIFY_CACHE_MAX = 4096
+_verify_cache: OrderedDict[bytes, bool] = OrderedDict()
+
+
+def hash_password(password: str) -> bytes:
+    # Stored as a raw BLOB so login never decodes or re-encodes the value.
+    return ph.hash(password).encode("ascii")
+
+
+def _as_bytes(stored: bytes | str) -> bytes:
+    # Rows written before the BLOB migration come back as str.
+    return stored if isinstance(stored, bytes) else stored.encode("utf-8")
+
 
+def _is_legacy_hash(stored: bytes) -> bool:
+    # Pre-Argon2 hashes were "<b64 salt>$<b64 sha256 digest>".
+    return not stored.startswith(b"$argon2")
 
-def verify_password(password: str, stored: str) -> bool:
+
+def _verify_legacy(password: str, stored: bytes) -> bool:
     try:
-        salt_b64, hash_b64 = stored.split("$")
+        salt_b64, hash_b64 = stored.split(b"$")
     except ValueError:
         return False
 
@@ -91,17 +198,191 @@ def verify_password(password: str, stored: str) -> bool:
     return hmac.compare_digest(digest, expected)
 
 
-init_db()
+def _verify_cache_key(password: str, stored: bytes) -> bytes:
+    return hmac.new(
+        _PEPPER,
+        password.encode("utf-8") + b"\x00" + stored,
+        hashlib.sha256,
+    ).digest()
+
+
+def _verify_cache_get(key: bytes) -> bool | None:
+    cached = _verify_cache.get(key)
+    if cached is not None:
+        _verify_cache.move_to_end(key)
+    return cached
+
+
+def _verify_cache_put(key: bytes, ok: bool) -> None:
+    _verify_cache[key] = ok
+    if len(_verify_cache) > _VERIFY_CACHE_MAX:
+        _verify_cache.popitem(last=False)
+
+
+def _verify_uncached(password: str, stored: bytes) -> bool:
+    if _is_legacy_hash(stored):
+        return _verify_legacy(password, stored)
+    try:
+        return ph.verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False
 
 
-games = {}        # room_id -> chess.Board
-connections = {}  # room_id -> list of websockets
-players = {}      # room_id -> { websocket: "w" | "b" | "spectator" }
-ws_user_ids = {}  # websocket -> user_id (optional)
-ws_usernames = {}  # websocket -> username (optional)
+def verify_password(password: str, stored: bytes | str) -> bool:
+    stored = _as_bytes(stored)
+    key = _verify_cache_key(password, stored)
 
-# room metadata used for recording completed games
-room_meta = {}  # room_id -> { "white_id", "black_id", "moves" (list[str]), "created_at", "finished" }
+    cached = _verify_cache_get(key)
+    if cached is not None:
+        return cached
+
+    ok = _verify_uncached(password, stored)
+    _verify_cache_put(key, ok)
+    return ok
+
+
+def password_needs_rehash(stored: bytes | str) -> bool:
+    stored = _as_bytes(stored)
+    return _is_legacy_hash(stored) or ph.check_needs_rehash(stored.decode("ascii"))
+
+
+async def _verify_password_async(password: str, stored: bytes | str) -> bool:
+    """verify_password with the cache probed in this process (the HMAC key
+    costs microseconds) and only the actual KDF dispatched to the process
+    pool on a miss, so the result lands back in the one shared cache."""
+    stored = _as_bytes(stored)
+    key = _verify_cache_key(password, stored)
+
+    cached = _verify_cache_get(key)
+    if cached is not None:
+        return cached
+
+    if kdf_executor is None:
+        ok = _verify_uncached(password, stored)
+    else:
+        ok = await asyncio.get_running_loop().run_in_executor(
+            kdf_executor, _verify_uncached, password, stored
+        )
+
+    _verify_cache_put(key, ok)
+    return ok
+
+
+async def _hash_password_async(password: str) -> bytes:
+    """hash_password dispatched to the process pool — hashing costs the same
+    ~50ms of KDF work as verification; falls back to an inline call before
+    the pool exists."""
+    if kdf_executor is None:
+        return hash_password(password)
+    return await asyncio.get_running_loop().run_in_executor(
+        kdf_executor, hash_password, password
+    )
+
+
+# Hash verified against when a login names an unknown user, so that branch
+# costs the same KDF work as a real wrong-password attempt and response
+# latency doesn't reveal whether a username exists.
+_DUMMY_HASH = ph.hash("unused-but-realistic-password").encode("ascii")
+
+
+# How long a room may sit idle before the sweeper reclaims it.
+ROOM_IDLE_NS = 2 * 60 * 60 * 1_000_000_000  # 2 hours
+SWEEP_INTERVAL_S = 300
+
+# How many moves accumulate in RAM before being written to game_moves
+MOVE_FLUSH_EVERY = 16
+
+
+@dataclass(slots=True)
+class Room:
+    """All per-room state, consolidated from what used to be six parallel
+    module-level dicts so the message handler does one lookup per room."""
+
+    board: chess.Board = field(default_factory=chess.Board)
+    connections: set[WebSocket] = field(default_factory=set)
+    legal_moves: set[str] = field(default_factory=set)  # UCI strings, current position
+    white_id: int | None = None
+    black_id: int | None = None
+    created_at: int = 0  # time.time_ns() at room creation
+    last_active: int = 0  # time.time_ns() of the last join or move
+    finished: bool = False
+    game_id: int | None = None  # rowid of this room's pending games row
+    ply_count: int = 0  # total plies played
+    pending_moves: list[tuple[int, int, str]] = field(default_factory=list)
+    inbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    consumer: asyncio.Task | None = None
+
+
+@dataclass(slots=True)
+class WSState:
+    """Per-connection state: room membership, assigned color, identity."""
+
+    room_id: str
+    color: str  # "w" | "b" | "spectator"
+    user_id: int | None = None
+    username: str | None = None
+
+
+rooms: dict[str, Room] = {}
+ws_state: dict[WebSocket, WSState] = {}
+
+
+def _fmt_iso(ns: int) -> str:
+    """Format a time.time_ns() timestamp as naive-UTC ISO at second
+    granularity. time.gmtime plus one f-string skips the datetime object
+    and per-field string construction of utcfromtimestamp().isoformat()."""
+    t = time.gmtime(ns // 1_000_000_000)
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+    )
+
+# How often (in plies) clients get a full-FEN resync instead of a move delta
+RESYNC_PLIES = 20
+
+# Elo expected score for a rating difference (opponent - player), precomputed
+# for the clamped range -1000..1000 so finalizing a game never calls pow().
+_ELO_DIFF_MAX = 1000
+_EXP_TABLE = [
+    1.0 / (1.0 + 10.0 ** (d / 400.0))
+    for d in range(-_ELO_DIFF_MAX, _ELO_DIFF_MAX + 1)
+]
+
+
+# SQL kept as module constants so every call reuses the exact same statement
+# text (and therefore the connection's prepared-statement cache) instead of
+# rebuilding it per request.
+_SQL_INSERT_USER = (
+    "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)"
+)
+_SQL_SELECT_LOGIN = "SELECT id, password_hash FROM users WHERE username = ?"
+_SQL_UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = ? WHERE id = ?"
+_SQL_SELECT_RATINGS = (
+    "SELECT id, rating FROM users WHERE id IN (?, ?) ORDER BY id"
+)
+_SQL_UPDATE_STATS = """
+    UPDATE users
+    SET rating = ?, wins = wins + ?, losses = losses + ?, draws = draws + ?
+    WHERE id = ?
+"""
+# A pending games row is created when a room's first move is played ('*' is
+# the chess convention for an unfinished result; moves stream into game_moves
+# instead of the legacy moves column) and finalized in place when the game
+# ends. Rooms that never see a move never touch the database.
+_SQL_INSERT_PENDING_GAME = """
+    INSERT INTO games (room_id, result, moves, created_at, finished_at)
+    VALUES (?, '*', '', ?, '')
+"""
+_SQL_INSERT_GAME_MOVE = (
+    "INSERT OR REPLACE INTO game_moves (game_id, ply, uci) VALUES (?, ?, ?)"
+)
+_SQL_FINALIZE_GAME = """
+    UPDATE games
+    SET white_id = ?, black_id = ?, result = ?, reason = ?, finished_at = ?
+    WHERE id = ?
+"""
+_SQL_DELETE_GAME_MOVES = "DELETE FROM game_moves WHERE game_id = ?"
+_SQL_DELETE_PENDING_GAME = "DELETE FROM games WHERE id = ? AND result = '*'"
 
 
 class SignupRequest(BaseModel):
@@ -126,20 +407,23 @@ async def read_root():
 
 @app.get("/online-users")
 async def online_users():
-    # Unique set of users that currently have an open websocket
-    by_user_id: dict[int, str] = {}
-    for ws, uid in ws_user_ids.items():
-        if uid is None:
-            continue
-        username = ws_usernames.get(ws)
-        if username is None:
-            continue
-        by_user_id[uid] = username
-
-    return [
-        {"user_id": user_id, "username": username}
-        for user_id, username in by_user_id.items()
-    ]
+    # Unique set of users that currently have an open websocket; usernames
+    # come from the users table rather than trusting the query parameter
+    # each client connected with.
+    user_ids = {st.user_id for st in ws_state.values() if st.user_id is not None}
+    if not user_ids:
+        return []
+
+    placeholders = ",".join("?" * len(user_ids))
+    async with pool.connection() as conn:
+        cur = await conn.execute(
+            f"SELECT id, username FROM users WHERE id IN ({placeholders})",
+            tuple(user_ids),
+        )
+        rows = await cur.fetchall()
+        await cur.close()
+
+    return [{"user_id": row["id"], "username": row["username"]} for row in rows]
 
 
 @app.post("/signup")
@@ -150,17 +434,18 @@ async def signup(payload: SignupRequest):
     if len(payload.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    conn = get_connection()
-    try:
-        with conn:
-            conn.execute(
-                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
-                (username, hash_password(payload.password), datetime.utcnow().isoformat()),
+    pwd_hash = await _hash_password_async(payload.password)
+
+    async with pool.connection() as conn:
+        try:
+            await conn.execute(
+                _SQL_INSERT_USER,
+                (username, pwd_hash, _fmt_iso(time.time_ns())),
             )
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=409, detail="Username already taken")
-    finally:
-        conn.close()
+            await conn.commit()
+        except sqlite3.IntegrityError:
+            await conn.rollback()
+            raise HTTPException(status_code=409, detail="Username already taken")
 
     return {"message": "User created"}
 
@@ -168,45 +453,59 @@ async def signup(payload: SignupRequest):
 @app.post("/login", response_model=LoginResponse)
 async def login(payload: LoginRequest):
     username = payload.username.strip()
-    conn = get_connection()
-    try:
-        cur = conn.execute(
-            "SELECT id, password_hash FROM users WHERE username = ?", (username,)
-        )
-        row = cur.fetchone()
-    finally:
-        conn.close()
+    async with pool.connection() as conn:
+        cur = await conn.execute(_SQL_SELECT_LOGIN, (username,))
+        row = await cur.fetchone()
+        await cur.close()
+
+    if row is None:
+        # Burn the same KDF cost as a wrong-password attempt so timing
+        # doesn't leak which usernames exist.
+        await _verify_password_async(payload.password, _DUMMY_HASH)
+        raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    if row is None or not verify_password(payload.password, row["password_hash"]):
+    if not await _verify_password_async(payload.password, row["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
+    # Transparently upgrade legacy SHA-256 (or outdated Argon2) hashes now
+    # that we know the plaintext is correct.
+    if password_needs_rehash(row["password_hash"]):
+        new_hash = await _hash_password_async(payload.password)
+        async with pool.connection() as conn:
+            await conn.execute(
+                _SQL_UPDATE_PASSWORD_HASH,
+                (new_hash, row["id"]),
+            )
+            await conn.commit()
+
     return LoginResponse(user_id=row["id"], username=username)
 
 
-def _update_ratings_and_stats(
-    conn: sqlite3.Connection,
+async def _update_ratings_and_stats(
+    conn: aiosqlite.Connection,
     white_id: int,
     black_id: int,
     result: str,
 ) -> None:
-    cur = conn.execute(
-        "SELECT id, rating, wins, losses, draws FROM users WHERE id IN (?, ?)",
-        (white_id, black_id),
-    )
-    rows = {row["id"]: row for row in cur.fetchall()}
-    if white_id not in rows or black_id not in rows:
+    cur = await conn.execute(_SQL_SELECT_RATINGS, (white_id, black_id))
+    rows = await cur.fetchall()
+    await cur.close()
+    if len(rows) != 2:
         return
 
-    white = rows[white_id]
-    black = rows[black_id]
+    if rows[0]["id"] == white_id:
+        white, black = rows
+    else:
+        black, white = rows
 
     rw = int(white["rating"])
     rb = int(black["rating"])
     k = 32
 
-    # Expected scores
-    exp_w = 1.0 / (1.0 + pow(10.0, (rb - rw) / 400.0))
-    exp_b = 1.0 / (1.0 + pow(10.0, (rw - rb) / 400.0))
+    # Expected scores via lookup; exp_b follows from symmetry
+    diff = max(-_ELO_DIFF_MAX, min(_ELO_DIFF_MAX, rb - rw))
+    exp_w = _EXP_TABLE[diff + _ELO_DIFF_MAX]
+    exp_b = 1.0 - exp_w
 
     if result == "white":
         sw, sb = 1.0, 0.0
@@ -227,64 +526,240 @@ def _update_ratings_and_stats(
     new_rw = max(100, round(rw + k * (sw - exp_w)))
     new_rb = max(100, round(rb + k * (sb - exp_b)))
 
-    conn.execute(
-        """
-        UPDATE users
-        SET rating = ?, wins = wins + ?, losses = losses + ?, draws = draws + ?
-        WHERE id = ?
-        """,
-        (new_rw, wins_w, losses_w, draws_delta, white_id),
-    )
-    conn.execute(
-        """
-        UPDATE users
-        SET rating = ?, wins = wins + ?, losses = losses + ?, draws = draws + ?
-        WHERE id = ?
-        """,
-        (new_rb, wins_b, losses_b, draws_delta, black_id),
+    # Both rows in one prepared statement: one VM dispatch, one lock, and
+    # (with WAL) a single fsync per finished game.
+    await conn.executemany(
+        _SQL_UPDATE_STATS,
+        [
+            (new_rw, wins_w, losses_w, draws_delta, white_id),
+            (new_rb, wins_b, losses_b, draws_delta, black_id),
+        ],
     )
 
 
-def record_completed_game(room_id: str, result: str, reason: str | None) -> None:
-    meta = room_meta.get(room_id)
-    if not meta or meta.get("finished"):
+async def record_completed_game(room_id: str, result: str, reason: str | None) -> None:
+    room = rooms.get(room_id)
+    if room is None or room.finished:
         return
 
-    white_id = meta.get("white_id")
-    black_id = meta.get("black_id")
+    white_id = room.white_id
+    black_id = room.black_id
     if not white_id or not black_id:
-        # Without both players we don't record ratings, but we still mark finished
-        meta["finished"] = True
+        # Without both players there are no ratings to record and nothing
+        # finalizes the pending row, so delete it (and its streamed moves)
+        # rather than leaving a permanent '*' row behind.
+        if room.game_id is not None:
+            async with pool.connection() as conn:
+                await conn.execute(_SQL_DELETE_GAME_MOVES, (room.game_id,))
+                await conn.execute(_SQL_DELETE_PENDING_GAME, (room.game_id,))
+                await conn.commit()
+            room.game_id = None
+            room.pending_moves = []
+        room.finished = True
         return
 
-    moves_text = " ".join(meta.get("moves", []))
-    now_iso = datetime.utcnow().isoformat()
+    now_iso = _fmt_iso(time.time_ns())
 
-    conn = get_connection()
-    try:
-        with conn:
-            conn.execute(
-                """
-                INSERT INTO games (room_id, white_id, black_id, result, reason, moves, created_at, finished_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    room_id,
-                    white_id,
-                    black_id,
-                    result,
-                    reason,
-                    moves_text,
-                    meta.get("created_at", now_iso),
-                    now_iso,
-                ),
+    async with pool.connection() as conn:
+        if room.game_id is not None:
+            if room.pending_moves:
+                await conn.executemany(_SQL_INSERT_GAME_MOVE, room.pending_moves)
+                room.pending_moves = []
+            await conn.execute(
+                _SQL_FINALIZE_GAME,
+                (white_id, black_id, result, reason, now_iso, room.game_id),
             )
 
-            _update_ratings_and_stats(conn, white_id, black_id, result)
-    finally:
-        conn.close()
+        await _update_ratings_and_stats(conn, white_id, black_id, result)
+        await conn.commit()
+
+    room.finished = True
+
+
+async def _flush_pending_moves(room: Room) -> None:
+    if room.game_id is None or not room.pending_moves:
+        return
+    batch = room.pending_moves
+    room.pending_moves = []
+    async with pool.connection() as conn:
+        await conn.executemany(_SQL_INSERT_GAME_MOVE, batch)
+        await conn.commit()
+
+
+async def _room_loop(room_id: str, room: Room) -> None:
+    """Per-room consumer task that owns the board.
+
+    Producer coroutines only enqueue raw move messages and return to
+    receiving immediately; move application stays serialized here (one
+    writer per board) and broadcast fanout no longer blocks the mover's
+    receive loop.
+    """
+    board = room.board
+    while True:
+        data, websocket = await room.inbox.get()
+        try:
+            # A finalized draw (threefold, fifty-move) routinely leaves legal
+            # moves on the board, so validation alone won't stop play after
+            # the result is recorded.
+            if room.finished:
+                await websocket.send_bytes(
+                    orjson.dumps(
+                        {
+                            "type": "error",
+                            "message": "The game is over",
+                        }
+                    )
+                )
+                continue
+
+            # Enforce player color and turn
+            st = ws_state.get(websocket)
+            player_color = st.color if st is not None else "spectator"
+
+            if player_color not in ("w", "b"):
+                await websocket.send_bytes(
+                    orjson.dumps(
+                        {
+                            "type": "error",
+                            "message": "Spectators cannot make moves",
+                        }
+                    )
+                )
+                continue
 
-    meta["finished"] = True
+            side_to_move = "w" if board.turn == chess.WHITE else "b"
+            if player_color != side_to_move:
+                await websocket.send_bytes(
+                    orjson.dumps(
+                        {
+                            "type": "error",
+                            "message": "It is not your turn",
+                        }
+                    )
+                )
+                continue
+
+            # Validation, push and game-over detection live in
+            # move_handler so the hot path can run as compiled code.
+            applied = apply_move(board, room.legal_moves, data["move"])
+
+            if not applied.ok:
+                await websocket.send_bytes(orjson.dumps({
+                    "type": "error",
+                    "message": "Invalid move"
+                }))
+                continue
+
+            room.legal_moves = applied.legal_moves
+
+            last_move_uci = applied.uci
+
+            room.last_active = time.time_ns()
+            room.ply_count += 1
+
+            # The pending games row is created lazily on the first applied
+            # move, so rooms that are only ever visited (typo'd URLs,
+            # spectators) never leave a row behind.
+            if room.game_id is None:
+                async with pool.connection() as conn:
+                    cur = await conn.execute(
+                        _SQL_INSERT_PENDING_GAME,
+                        (room_id, _fmt_iso(room.created_at)),
+                    )
+                    await conn.commit()
+                    room.game_id = cur.lastrowid
+
+            room.pending_moves.append(
+                (room.game_id, room.ply_count, last_move_uci)
+            )
+            if len(room.pending_moves) >= MOVE_FLUSH_EVERY:
+                await _flush_pending_moves(room)
+
+            game_over = applied.game_over
+            result = applied.result
+            reason = applied.reason
+
+            if game_over:
+                # Persist completed game and update ratings/stats
+                await record_completed_game(room_id, result, reason)
+
+            # Broadcast the move to all players. Most moves go out as a
+            # compact delta that clients replay on their own board; a
+            # full-FEN resync is sent every RESYNC_PLIES plies and at game
+            # over. board.fen() is built at most once per move, never once
+            # per recipient, and all sends are dispatched concurrently.
+            if game_over or room.ply_count % RESYNC_PLIES == 0:
+                base = {
+                    "type": "state",
+                    "fen": board.fen(),
+                    "last_move": last_move_uci,
+                }
+
+                if game_over:
+                    base["game_over"] = True
+                    base["result"] = result
+                    base["reason"] = reason
+
+                by_color = {
+                    color: orjson.dumps({**base, "color": color})
+                    for color in ("w", "b", "spectator")
+                }
+
+                await asyncio.gather(
+                    *(
+                        conn.send_bytes(by_color[ws_state[conn].color])
+                        for conn in room.connections
+                        if conn in ws_state
+                    ),
+                    return_exceptions=True,
+                )
+            else:
+                buf = orjson.dumps({"type": "move", "uci": last_move_uci})
+                await asyncio.gather(
+                    *(conn.send_bytes(buf) for conn in room.connections),
+                    return_exceptions=True,
+                )
+        except Exception as exc:  # keep the room alive; the sender may be gone
+            print(f"Error handling move in room {room_id}: {exc}")
+
+
+async def _evict_room(room_id: str, room: Room) -> None:
+    """Drop a room and stop its consumer so finished/abandoned games don't
+    accumulate for the lifetime of the server."""
+    # Callers hold a reference captured earlier (e.g. at connect time); if
+    # the sweeper already evicted it and a new room reuses the id, evicting
+    # by id alone would tear down the wrong game.
+    if rooms.get(room_id) is not room:
+        return
+    if room.consumer is not None:
+        room.consumer.cancel()
+    del rooms[room_id]
+
+    # An abandoned game leaves behind its pending '*' row and any streamed
+    # moves; clean those up so they don't accumulate in the database.
+    if room.game_id is not None and not room.finished:
+        async with pool.connection() as conn:
+            await conn.execute(_SQL_DELETE_GAME_MOVES, (room.game_id,))
+            await conn.execute(_SQL_DELETE_PENDING_GAME, (room.game_id,))
+            await conn.commit()
+
+
+async def _sweep_idle_rooms() -> None:
+    """Background task reclaiming rooms with no activity for ROOM_IDLE_NS."""
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL_S)
+        cutoff = time.time_ns() - ROOM_IDLE_NS
+        for room_id, room in list(rooms.items()):
+            if room.last_active >= cutoff:
+                continue
+            for conn in list(room.connections):
+                ws_state.pop(conn, None)
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+            room.connections.clear()
+            await _evict_room(room_id, room)
 
 
 @app.websocket("/ws/{room_id}")
@@ -294,34 +769,36 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     print(f"WebSocket connection accepted for room {room_id}")
 
     # Optional: associate a logged-in user with this websocket (for stats/online list)
+    user_id = None
     user_id_param = websocket.query_params.get("user_id")
     if user_id_param is not None:
         try:
-            ws_user_ids[websocket] = int(user_id_param)
+            user_id = int(user_id_param)
         except ValueError:
-            ws_user_ids[websocket] = None
-
-    username_param = websocket.query_params.get("username")
-    if username_param is not None:
-        ws_usernames[websocket] = username_param
-
-    if room_id not in games:
-        games[room_id] = chess.Board()
-        connections[room_id] = []
-        players[room_id] = {}
-        room_meta[room_id] = {
-            "white_id": None,
-            "black_id": None,
-            "moves": [],
-            "created_at": datetime.utcnow().isoformat(),
-            "finished": False,
-        }
-
-    board = games[room_id]
-    connections[room_id].append(websocket)
+            user_id = None
+
+    username = websocket.query_params.get("username")
+
+    room = rooms.get(room_id)
+    if room is None:
+        board = chess.Board()
+        room = Room(
+            board=board,
+            legal_moves={m.uci() for m in board.legal_moves},
+            created_at=time.time_ns(),
+            last_active=time.time_ns(),
+        )
+        rooms[room_id] = room
+        room.consumer = asyncio.create_task(_room_loop(room_id, room))
+
+    board = room.board
+    room.connections.add(websocket)
+    room.last_active = time.time_ns()
 
     # Assign a color to this connection (first: white, second: black, others: spectator)
-    existing_colors = set(players[room_id].values())
+    existing_colors = {
+        ws_state[conn].color for conn in room.connections if conn in ws_state
+    }
 
     preferred = websocket.query_params.get("preferred", "any")
 
@@ -341,129 +818,49 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
 
     assigned_color = pick_color()
 
-    players[room_id][websocket] = assigned_color
+    ws_state[websocket] = WSState(
+        room_id=room_id,
+        color=assigned_color,
+        user_id=user_id,
+        username=username,
+    )
 
     # Remember which users played which color in this room
-    meta = room_meta.get(room_id)
-    user_id = ws_user_ids.get(websocket)
-    if meta is not None and user_id is not None:
-        if assigned_color == "w" and meta.get("white_id") is None:
-            meta["white_id"] = user_id
-        elif assigned_color == "b" and meta.get("black_id") is None:
-            meta["black_id"] = user_id
+    if user_id is not None:
+        if assigned_color == "w" and room.white_id is None:
+            room.white_id = user_id
+        elif assigned_color == "b" and room.black_id is None:
+            room.black_id = user_id
 
     print(
-        f"Total connections in {room_id}: {len(connections[room_id])}, "
+        f"Total connections in {room_id}: {len(room.connections)}, "
         f"assigned color: {assigned_color}"
     )
 
     # Send initial board state to this connection, including its assigned color
-    await websocket.send_json(
-        {
-            "type": "state",
-            "fen": board.fen(),
-            "color": assigned_color,
-        }
+    await websocket.send_bytes(
+        orjson.dumps(
+            {
+                "type": "state",
+                "fen": board.fen(),
+                "color": assigned_color,
+            }
+        )
     )
 
     try:
         while True:
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             print(f"Received data: {data}")
 
             if data["type"] == "move":
-                # Enforce player color and turn
-                player_color = players[room_id].get(websocket)
-
-                if player_color not in ("w", "b"):
-                    await websocket.send_json(
-                        {
-                            "type": "error",
-                            "message": "Spectators cannot make moves",
-                        }
-                    )
-                    continue
-
-                side_to_move = "w" if board.turn == chess.WHITE else "b"
-                if player_color != side_to_move:
-                    await websocket.send_json(
-                        {
-                            "type": "error",
-                            "message": "It is not your turn",
-                        }
-                    )
-                    continue
-
-                move = chess.Move.from_uci(data["move"])
-
-                if move in board.legal_moves:
-                    board.push(move)
-
-                    last_move_uci = move.uci()
-
-                    # Track moves for later storage
-                    meta = room_meta.get(room_id)
-                    if meta is not None:
-                        meta.setdefault("moves", []).append(last_move_uci)
-
-                    # Determine game-over state after the move
-                    game_over = board.is_game_over()
-                    result = None
-                    reason = None
-
-                    if game_over:
-                        if board.is_checkmate():
-                            # After push, board.turn is the side that LOST
-                            loser = "w" if board.turn == chess.WHITE else "b"
-                            winner = "b" if loser == "w" else "w"
-                            result = "white" if winner == "w" else "black"
-                            reason = "checkmate"
-                        elif board.is_stalemate():
-                            result = "draw"
-                            reason = "stalemate"
-                        elif board.is_insufficient_material():
-                            result = "draw"
-                            reason = "insufficient_material"
-                        elif board.can_claim_threefold_repetition():
-                            result = "draw"
-                            reason = "threefold_repetition"
-                        elif board.can_claim_fifty_moves():
-                            result = "draw"
-                            reason = "fifty_move_rule"
-                        else:
-                            result = "draw"
-                            reason = "draw"
-
-                        # Persist completed game and update ratings/stats
-                        record_completed_game(room_id, result, reason)
-
-                    # Broadcast updated board to all players, including
-                    # each player's assigned color in their own message
-                    for conn in connections[room_id]:
-                        color = players[room_id].get(conn, "spectator")
-                        payload = {
-                            "type": "state",
-                            "fen": board.fen(),
-                            "color": color,
-                            "last_move": last_move_uci,
-                        }
-
-                        if game_over:
-                            payload["game_over"] = True
-                            payload["result"] = result
-                            payload["reason"] = reason
-
-                        await conn.send_json(payload)
-                else:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Invalid move"
-                    })
+                # Hand the move to the room's consumer task and go straight
+                # back to receiving; application and fanout happen there.
+                await room.inbox.put((data, websocket))
 
     except WebSocketDisconnect:
         print(f"WebSocket disconnected from room {room_id}")
-        connections[room_id].remove(websocket)
-        if room_id in players:
-            players[room_id].pop(websocket, None)
-        ws_user_ids.pop(websocket, None)
-        ws_usernames.pop(websocket, None)
+        ws_state.pop(websocket, None)
+        room.connections.discard(websocket)
+        if not room.connections and room.finished:
+            await _evict_room(room_id, room)
@@ -0,0 +1,95 @@
+"""Hot-path move application, extracted from main.py.
+
+Everything here is fully annotated and free of framework imports so the
+module can be compiled to a C extension with mypyc::
+
+    pip install mypy
+    cd backend && mypyc move_handler.py
+
+The compiled module shadows this file on import, so nothing else needs to
+change; without it the same code runs interpreted.
+"""
+
+from dataclasses import dataclass, field
+
+import chess
+
+__all__ = ["MoveOutcome", "apply_move", "describe_outcome"]
+
+
+@dataclass
+class MoveOutcome:
+    """Result of applying one move: validity, the refreshed legal-move cache
+    for the new position, and terminal state if the game just ended."""
+
+    ok: bool
+    uci: str = ""
+    legal_moves: set[str] = field(default_factory=set)
+    game_over: bool = False
+    result: str | None = None
+    reason: str | None = None
+
+
+def describe_outcome(outcome: chess.Outcome) -> tuple[str, str]:
+    """Map a python-chess Outcome to our (result, reason) strings."""
+    t = outcome.termination
+    if t == chess.Termination.CHECKMATE:
+        return ("white" if outcome.winner == chess.WHITE else "black", "checkmate")
+    if t == chess.Termination.STALEMATE:
+        return "draw", "stalemate"
+    if t == chess.Termination.INSUFFICIENT_MATERIAL:
+        return "draw", "insufficient_material"
+    if t in (chess.Termination.THREEFOLD_REPETITION, chess.Termination.FIVEFOLD_REPETITION):
+        return "draw", "threefold_repetition"
+    if t in (chess.Termination.FIFTY_MOVES, chess.Termination.SEVENTYFIVE_MOVES):
+        return "draw", "fifty_move_rule"
+    return "draw", "draw"
+
+
+def apply_move(board: chess.Board, legal_moves: set[str], uci: str) -> MoveOutcome:
+    """Validate ``uci`` against the cached legal-move set, push it and decide
+    whether the game is over.
+
+    Validation is a single hash lookup (malformed UCI simply misses the set),
+    with board.is_legal as the fallback when the cache is absent.
+    """
+    if legal_moves:
+        is_legal = uci in legal_moves
+    else:
+        try:
+            is_legal = board.is_legal(chess.Move.from_uci(uci))
+        except ValueError:
+            is_legal = False
+
+    if not is_legal:
+        return MoveOutcome(ok=False)
+
+    board.push(chess.Move.from_uci(uci))
+    new_legal = {m.uci() for m in board.legal_moves}
+
+    # Fast path: with legal moves available there is no mate or stalemate,
+    # and claimable draws by repetition or the fifty-move rule need at
+    # least 7 reversible plies — positions cannot repeat across a pawn move
+    # or capture, and can_claim_threefold_repetition also counts a
+    # repetition first reachable by the claimant's next move — so the full
+    # termination scan is skipped for almost all moves.
+    if (
+        new_legal
+        and board.halfmove_clock < 7
+        and not board.is_insufficient_material()
+    ):
+        return MoveOutcome(ok=True, uci=uci, legal_moves=new_legal)
+
+    outcome = board.outcome(claim_draw=True)
+    if outcome is None:
+        return MoveOutcome(ok=True, uci=uci, legal_moves=new_legal)
+
+    result, reason = describe_outcome(outcome)
+    return MoveOutcome(
+        ok=True,
+        uci=uci,
+        legal_moves=new_legal,
+        game_over=True,
+        result=result,
+        reason=reason,
+    )
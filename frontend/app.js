@@ -37,6 +37,12 @@ const ws = new WebSocket(
   `ws://127.0.0.1:8000/ws/${roomId}?user_id=${userIdParam}&username=${usernameParam}&preferred=${encodeURIComponent(preferredColor)}`
 );
 
+// The server sends binary (orjson-encoded) frames; receive them as
+// ArrayBuffers rather than Blobs so they can be decoded synchronously.
+ws.binaryType = "arraybuffer";
+
+const utf8Decoder = new TextDecoder();
+
 console.log("WebSocket created, waiting for connection...");
 
 const pieces = {
@@ -124,6 +130,73 @@ function renderBoardFromFen(fen) {
   }
 }
 
+// Apply a UCI move ('move' delta messages) directly to our FEN. The server
+// owns legality and resyncs a full FEN periodically, so only piece
+// placement, the side to move, and the fullmove number need to stay exact;
+// castling-rights and en-passant fields are left blank.
+function applyUciToFen(fen, uci) {
+  const parts = fen.split(' ');
+  const ranks = parts[0].split('/').map(parseRank);
+
+  const fileOf = (sq) => sq.charCodeAt(0) - 'a'.charCodeAt(0);
+  const rankOf = (sq) => 8 - parseInt(sq[1], 10);
+
+  const ff = fileOf(uci.slice(0, 2));
+  const fr = rankOf(uci.slice(0, 2));
+  const tf = fileOf(uci.slice(2, 4));
+  const tr = rankOf(uci.slice(2, 4));
+
+  let piece = ranks[fr][ff];
+  ranks[fr][ff] = null;
+
+  // En passant: a pawn moving diagonally onto an empty square captures the
+  // pawn it passed.
+  if ((piece === 'P' || piece === 'p') && ff !== tf && !ranks[tr][tf]) {
+    ranks[fr][tf] = null;
+  }
+
+  // Castling: the king moves two files and brings the rook across.
+  if ((piece === 'K' || piece === 'k') && Math.abs(tf - ff) === 2) {
+    const rookFrom = tf > ff ? 7 : 0;
+    const rookTo = tf > ff ? tf - 1 : tf + 1;
+    ranks[tr][rookTo] = ranks[tr][rookFrom];
+    ranks[tr][rookFrom] = null;
+  }
+
+  // Promotion: the fifth UCI character names the new piece.
+  if (uci.length > 4) {
+    piece = piece === 'P' ? uci[4].toUpperCase() : uci[4].toLowerCase();
+  }
+  ranks[tr][tf] = piece;
+
+  const placement = ranks
+    .map((row) => {
+      let out = '';
+      let empty = 0;
+      for (const p of row) {
+        if (p) {
+          if (empty > 0) {
+            out += empty;
+            empty = 0;
+          }
+          out += p;
+        } else {
+          empty += 1;
+        }
+      }
+      if (empty > 0) {
+        out += empty;
+      }
+      return out;
+    })
+    .join('/');
+
+  const active = parts[1] === 'w' ? 'b' : 'w';
+  const fullMoveNum = parseInt(parts[5] || '1', 10) + (parts[1] === 'b' ? 1 : 0);
+
+  return `${placement} ${active} - - 0 ${fullMoveNum}`;
+}
+
 function handleSquareClick(square) {
   if (ws.readyState !== WebSocket.OPEN) {
     alert('Not connected to server yet');
@@ -289,8 +362,10 @@ ws.onopen = () => {
 };
 
 ws.onmessage = (event) => {
-  console.log('Message received:', event.data);
-  const data = JSON.parse(event.data);
+  const raw =
+    typeof event.data === 'string' ? event.data : utf8Decoder.decode(event.data);
+  console.log('Message received:', raw);
+  const data = JSON.parse(raw);
 
   if (data.type === 'state') {
     currentFen = data.fen;
@@ -326,24 +401,40 @@ ws.onmessage = (event) => {
       return;
     }
 
-    const parts = currentFen.split(' ');
-    const turnColor = parts[1] === 'w' ? 'White' : 'Black';
-
-    let youText = '';
-    if (myColor === 'w') {
-      youText = 'You are White · ';
-    } else if (myColor === 'b') {
-      youText = 'You are Black · ';
-    } else if (myColor === 'spectator') {
-      youText = 'Spectator · ';
+    updateTurnStatus();
+  } else if (data.type === 'move') {
+    // Delta update: replay the UCI move on our board instead of receiving
+    // (and re-parsing) a whole FEN.
+    if (!currentFen) {
+      return; // nothing to apply the delta to before the first full state
     }
 
-    statusEl.innerText = `${youText}${turnColor} to move`;
+    currentFen = applyUciToFen(currentFen, data.uci);
+
+    renderBoardFromFen(currentFen);
+    logMoveToList(data.uci, currentFen);
+    updateTurnStatus();
   } else if (data.type === 'error') {
     alert(data.message);
   }
 };
 
+function updateTurnStatus() {
+  const parts = currentFen.split(' ');
+  const turnColor = parts[1] === 'w' ? 'White' : 'Black';
+
+  let youText = '';
+  if (myColor === 'w') {
+    youText = 'You are White · ';
+  } else if (myColor === 'b') {
+    youText = 'You are Black · ';
+  } else if (myColor === 'spectator') {
+    youText = 'Spectator · ';
+  }
+
+  statusEl.innerText = `${youText}${turnColor} to move`;
+}
+
 ws.onerror = (error) => {
   console.error('WebSocket error:', error);
   statusEl.innerText = 'Error: WebSocket connection failed';